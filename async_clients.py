@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+async_clients.py
+
+Process-wide async HTTP and OpenAI clients and the event loop they live on.
+
+httpx.AsyncClient (like AsyncOpenAI, which wraps one) binds its connection pool to the
+event loop it first runs on, so a fresh asyncio.run() per call would strand pooled
+connections on a dead loop. Instead every coroutine that touches these clients runs on
+one long-lived background loop:
+
+    from async_clients import HTTP_CLIENT, run_sync
+
+    async def fetch(url):
+        r = await HTTP_CLIENT.get(url)
+        ...
+
+    run_sync(fetch(url))            # from any ordinary (non-loop) thread
+
+HTTP_CLIENT speaks HTTP/2 where the server supports it, so concurrent title fetches and
+image downloads against the same retailer/CDN host share one TCP+TLS connection.
+openai_client() returns the one AsyncOpenAI instance every GPT call should use; it has
+its own HTTP/2 pool to api.openai.com (separate from HTTP_CLIENT's scraping headers).
+
+Requirements:
+- `pip install openai "httpx[http2]"`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient  # pip install openai
+
+T = TypeVar("T")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+HTTP_CLIENT = httpx.AsyncClient(
+    timeout=20,
+    follow_redirects=True,
+    headers={"User-Agent": USER_AGENT},
+    # Retries cover connection failures only (httpx never retries a sent request)
+    transport=httpx.AsyncHTTPTransport(http2=True, limits=_LIMITS, retries=2),
+)
+
+
+
+@functools.lru_cache(maxsize=None)
+def openai_client() -> AsyncOpenAI:
+    """
+    Shared AsyncOpenAI client (reads OPENAI_API_KEY from env). Built lazily so importing
+    this module doesn't require the key; building one per call would redo the TLS
+    handshake and pool setup every time.
+    """
+    return AsyncOpenAI(
+        http_client=DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    )
+
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_THREAD: Optional[threading.Thread] = None
+_LOOP_LOCK = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The shared background event loop (started on first use)."""
+    global _LOOP, _LOOP_THREAD
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            _LOOP_THREAD = threading.Thread(target=_LOOP.run_forever, name="async-clients-loop", daemon=True)
+            _LOOP_THREAD.start()
+    return _LOOP
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run `coro` to completion on the shared loop and return its result.
+
+    Safe to call from any thread except the loop thread itself (that would deadlock);
+    code already running on the loop should simply `await` instead.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _LOOP_THREAD:
+        coro.close()
+        raise RuntimeError("run_sync() called from the shared event loop; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
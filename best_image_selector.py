@@ -13,7 +13,8 @@ Pipeline:
         # (Your scraper can return additional fields; they'll be passed through.)
       }
 3) Uses GPT-5 twice:
-    a) to expand product name aliases (e.g., "couch" -> "sofa", etc.)
+    a) to expand product name aliases (e.g., "couch" -> "sofa", etc.) and pick the
+       product dimensions from the scraper's candidate strings, in one structured-output call
     b) to rank the images and choose the single best image where the main object is most visible
        and minimally occluded (measurement overlays are allowed).
 
@@ -21,6 +22,7 @@ Output (printed as JSON):
 {
   "url": "<input URL>",
   "company_name": "<company>",
+  "seed_product_names": ["sectional", ...],               # as extracted from the page
   "product_names": ["sectional", "couch", "sofa", ...],   # enriched aliases
   "dimensions": {...},                                    # passed through from scraper if present
   "all_image_urls": [...],                                # deduped
@@ -32,23 +34,32 @@ Output (printed as JSON):
 
 Requirements:
 - Python 3.9+
-- `pip install openai python-dotenv` (if you want .env support)
+- `pip install openai orjson python-dotenv` (python-dotenv only if you want .env support)
+- `pip install pillow-simd` (or plain `pillow`; the SIMD build speeds up the decode/convert path)
 - Environment variable: OPENAI_API_KEY
 - Local modules: extract_url_info.py and generic_web_scraper.py in PYTHONPATH
 
 Usage:
   python select_best_product_image.py "https://example.com/product"
   python select_best_product_image.py --max-images 20 "https://www.amazon.com/..."
+  python select_best_product_image.py --batch urls.txt      # offline, via the OpenAI Batch API
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
+import logging
 import os
 import sys
-from typing import Dict, List, Any, Optional
-from urllib.parse import urlparse
+import re
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import orjson  # pip install orjson -- model replies are parsed with it (C, ~3x stdlib json)
+
+logger = logging.getLogger(__name__)
 
 # Optional: load .env if present
 try:
@@ -59,7 +70,10 @@ except Exception:
 
 # Local modules you mentioned
 try:
-    from extract_url_info import extract_with_gpt5
+    from extract_url_info import (
+        extract_with_gpt5_async, fetch_title, domain_to_brand,
+        build_extract_request, parse_extract_output,
+    )
 except ImportError as e:
     print("ERROR: Could not import extract_with_gpt5 from extract_url_info.py", file=sys.stderr)
     raise
@@ -71,14 +85,11 @@ except ImportError as e:
     print("ERROR: Could not import main from generic_web_scraper.py", file=sys.stderr)
     raise
 
-# OpenAI client (official SDK v1+ style)
-try:
-    from openai import OpenAI  # pip install openai
-except ImportError:
-    print("ERROR: Please `pip install openai`.", file=sys.stderr)
-    raise
+from async_clients import HTTP_CLIENT, openai_client, run_sync
+from llm_cache import cached_call_async
+from rate_limit import RATE_LIMITER, RateLimiter, throttle
 
-MODEL_ALIAS_EXPANDER = "gpt-5"         # you asked for GPT-5
+MODEL_ENRICHER       = "gpt-5"         # aliases + dimensions in one call
 MODEL_IMAGE_RANKER   = "gpt-5"         # same model for ranking
 OPENAI_API_KEY       = os.getenv("OPENAI_API_KEY")
 
@@ -86,94 +97,255 @@ if not OPENAI_API_KEY:
     print("ERROR: OPENAI_API_KEY not set.", file=sys.stderr)
     sys.exit(1)
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Process-wide AsyncOpenAI (one connection pool for every GPT call); like HTTP_CLIENT it
+# is bound to the shared loop, so drive it through run_sync()
+client = openai_client()
+
+
+# Query params that only bust caches or pick a rendition size; they don't change which image it is
+_VOLATILE_QUERY_KEYS = frozenset({"v", "cb", "t", "_", "w", "h", "width", "height", "quality", "q", "fmt", "format"})
+# Filename tokens that mark a resized/thumbnail rendition: "_100x100.", "_sm.", Amazon's "._AC_SX679_."
+_SIZE_VARIANT_RE = re.compile(r"(?:_\d{2,4}x\d{2,4}|_(?:sm|small|thumb|thumbnail|tn))(?=\.)|\._[A-Z0-9_,]+_(?=\.)", re.IGNORECASE)
+# Of those, the ones that pick a rendition size (scored like filename tokens)
+_SIZE_QUERY_KEYS = frozenset({"w", "h", "width", "height"})
+# Pixel sizes inside such a token: Amazon's SL1500/SX679/SY300/UL1500/US40/SR300,300 and WxH
+_TOKEN_SIZE_RE = re.compile(r"(?:S[LXYSR]|U[LSXY])(\d+)|(\d+)x(\d+)", re.IGNORECASE)
+
+
+def _rendition_size(tokens: List[str], query_sizes: List[str]) -> float:
+    """
+    Largest pixel size named by the stripped filename tokens and w/h/width/height query
+    values (inf for an unsized original, 0 if sized but unparseable).
+    """
+    if not tokens and not query_sizes:
+        return float("inf")
+    sizes = [int(n) for t in tokens for m in _TOKEN_SIZE_RE.findall(t) for n in m if n]
+    sizes.extend(int(v) for v in query_sizes if v.isdigit())
+    return max(sizes, default=0)
+
+
+def _canonical_image_key(parsed) -> Tuple[str, float]:
+    """(dedup key, rendition size) for an already-urlsplit image URL."""
+    path = parsed.path
+    tokens = _SIZE_VARIANT_RE.findall(path)
+    stripped = _SIZE_VARIANT_RE.sub("", path) if tokens else path
+    kept: List[str] = []
+    query_sizes: List[str] = []
+    for k, v in parse_qsl(parsed.query, keep_blank_values=True):
+        lk = k.lower()
+        if lk in _SIZE_QUERY_KEYS:
+            query_sizes.append(v.strip())
+        elif lk not in _VOLATILE_QUERY_KEYS:
+            kept.append(f"{k}={v}")
+    query = "&".join(sorted(kept))
+    return f"{(parsed.hostname or '').lower()}{stripped}?{query}", _rendition_size(tokens, query_sizes)
 
 
 def normalize_url_list(urls: List[str], max_images: Optional[int] = None) -> List[str]:
-    """Dedupes, strips, basic filtering; optionally truncate."""
-    seen = set()
-    cleaned = []
+    """
+    Dedupes, strips, basic filtering; optionally truncate.
+
+    Dedup is on a canonical form (lowercased host, cache-busting/size query params and
+    thumbnail filename tokens dropped) so CDN variants of one image only reach the ranker
+    once. The original URL is kept for download: of the variants seen, the largest
+    rendition wins (an original with no size token or w/h param beats any sized one).
+
+    >>> normalize_url_list([
+    ...     "https://m.media-amazon.com/images/I/71abc._AC_US40_.jpg",
+    ...     "https://m.media-amazon.com/images/I/71abc._AC_SL1500_.jpg",
+    ... ])
+    ['https://m.media-amazon.com/images/I/71abc._AC_SL1500_.jpg']
+    >>> normalize_url_list(["https://x.com/sofa_100x100.jpg", "https://x.com/sofa_1500x1500.jpg"])
+    ['https://x.com/sofa_1500x1500.jpg']
+    >>> normalize_url_list(["https://x.com/sofa.jpg?v=1&w=400&h=400", "https://x.com/sofa.jpg?v=1&w=2000&h=2000"])
+    ['https://x.com/sofa.jpg?v=1&w=2000&h=2000']
+    >>> normalize_url_list(["https://x.com/sofa.jpg?v=1&width=100", "https://x.com/sofa.jpg?v=1&width=1800"])
+    ['https://x.com/sofa.jpg?v=1&width=1800']
+    """
+    by_key: Dict[str, int] = {}
+    cleaned: List[str] = []
+    sizes: List[float] = []
     for u in urls:
         if not isinstance(u, str):
             continue
         s = u.strip()
         if not s:
             continue
-        if s in seen:
-            continue
         # very rough filter: require http(s)
-        parsed = urlparse(s)
+        parsed = urlsplit(s)
         if parsed.scheme not in ("http", "https"):
             continue
-        seen.add(s)
+        key, size = _canonical_image_key(parsed)
+        idx = by_key.get(key)
+        if idx is not None:
+            if size > sizes[idx]:
+                cleaned[idx], sizes[idx] = s, size
+            continue
+        by_key[key] = len(cleaned)
         cleaned.append(s)
+        sizes.append(size)
         if max_images and len(cleaned) >= max_images:
             break
     return cleaned
 
 
-def expand_product_aliases_via_gpt5(seed_names: List[str]) -> List[str]:
+ENRICH_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "aliases": {"type": "array", "items": {"type": "string"}},
+        "dimensions": {
+            "type": "object",
+            "properties": {
+                "length": {"type": ["number", "null"]},
+                "width":  {"type": ["number", "null"]},
+                "height": {"type": ["number", "null"]},
+            },
+            "required": ["length", "width", "height"],
+            "additionalProperties": False,
+        },
+    },
+    "required": ["aliases", "dimensions"],
+    "additionalProperties": False,
+}
+
+
+async def combined_enrich_with_gpt5(
+    seed_names: List[str],
+    potential_dimension_values: List[str],
+) -> Tuple[List[str], Dict[str, Optional[float]]]:
     """
-    Ask GPT-5 for concise, high-signal aliases/synonyms (no brand names, no model numbers).
-    Return a deduped, lowercased list.
+    One GPT-5 call (structured outputs) that both expands the product name aliases and
+    picks the product's dimensions from the scraper's noisy candidate strings.
+
+    Returns (aliases, dimensions):
+      aliases    : deduped, lowercased list (seed names included)
+      dimensions : {"length": float|None, "width": float|None, "height": float|None}  # inches
     """
-    if not seed_names:
-        return []
+    if not seed_names and not potential_dimension_values:
+        return [], {"length": None, "width": None, "height": None}
+
+    request = _enrich_request(seed_names, potential_dimension_values)
+
+    async def _call() -> Tuple[List[str], Dict[str, Optional[float]]]:
+        await throttle(request)
+        resp = await client.responses.create(**request)
+        return _parse_enrich(resp.output_text, seed_names)
 
-    prompt = (
-        "You are helping expand concise product nouns for ranking images.\n"
+    aliases, dims = await cached_call_async({"fn": "combined_enrich", **request}, _call)
+    return aliases, dims
+
+
+def _enrich_request(seed_names: List[str], potential_dimension_values: List[str]) -> Dict[str, Any]:
+    """Responses API request body for combined_enrich_with_gpt5."""
+    user = (
+        "Task 1 - product name aliases (for ranking images).\n"
+        f"Seed names: {seed_names}\n"
         "Rules:\n"
-        " - Return ONLY a JSON array of short names.\n"
         " - Include plural/singular variants if common (e.g., 'sofa','sofas').\n"
         " - Include things that you may also have with the object. For example couches may have pillows.\n"
         " - Exclude brands, model numbers, materials unless essential to identity.\n"
-        " - Keep each item <= 3 words. No duplicates. Lowercase.\n\n"
-        f"Seed names: {seed_names}\n"
+        " - Keep each item <= 3 words. No duplicates. Lowercase.\n"
+        " - If there are no seed names, return an empty list.\n\n"
+        "Task 2 - product dimensions.\n"
+        "Candidate dimension strings:\n"
+        + "\n".join(f"- {s}" for s in potential_dimension_values)
+        + "\n\nRules:\n"
+          "- Prefer explicitly labeled product/item dimensions.\n"
+          "- Prefer product/item over package/box dimensions.\n"
+          "- Resolve synonyms: depth=breadth=width (unless clearly LxWxH triplet says otherwise); height is vertical.\n"
+          "- Normalize to inches (1 in = 2.54 cm; 25.4 mm = 1 in).\n"
+          "- Depth is the same as width.\n"
+          "- Use null for any value you cannot determine.\n\n"
+        "Return ONLY JSON per the schema: {aliases: [...], dimensions: {length, width, height}}."
     )
 
-    resp = client.chat.completions.create(
-        model=MODEL_ALIAS_EXPANDER,
-        messages=[
+    return {
+        "model": MODEL_ENRICHER,
+        "input": [
             {"role": "system", "content": "You are a precise, terse product taxonomy assistant."},
-            {"role": "user",   "content": prompt}
+            {"role": "user", "content": user},
         ],
-    )
+        "text": {
+            "format": {
+                "type": "json_schema",
+                "name": "product_enrichment",
+                "schema": ENRICH_SCHEMA,
+                "strict": True,
+            }
+        },
+    }
 
-    # The model may return an object; accept array if provided within it.
-    content = resp.choices[0].message.content.strip()
-    # Try array first; else try to find a key like {"aliases": [...]}
-    aliases: List[str] = []
-    try:
-        obj = json.loads(content)
-        if isinstance(obj, list):
-            aliases = obj
-        elif isinstance(obj, dict):
-            # Flexible: look for the first list value
-            for v in obj.values():
-                if isinstance(v, list):
-                    aliases = v
-                    break
-    except Exception:
-        # If not valid JSON, try a last-ditch split; but we asked for JSON, so this is unlikely.
-        aliases = []
+
+def _parse_enrich(
+    text: str,
+    seed_names: List[str],
+) -> Tuple[List[str], Dict[str, Optional[float]]]:
+    data = _loads_model_json(text, "enrich")
 
     # Dedup + keep seeds too
     pool = {s.strip().lower() for s in seed_names if isinstance(s, str)}
-    for a in aliases:
-        if isinstance(a, str):
-            pool.add(a.strip().lower())
+    if seed_names:
+        for a in data.get("aliases") or []:
+            if isinstance(a, str):
+                pool.add(a.strip().lower())
 
-    return sorted(pool)
+    dims = data.get("dimensions") or {}
 
+    def _num(x):
+        return None if x is None else float(x)
 
-def rank_images_with_gpt5(
+    return sorted(pool), {
+        "length": _num(dims.get("length")),
+        "width":  _num(dims.get("width")),
+        "height": _num(dims.get("height")),
+    }
+
+
+# The ranker sees images as {"0": url0, "1": url1, ...} and answers with indices, so URLs
+# aren't round-tripped through output tokens. best_index comes first (schema order) so
+# it can be picked out of the stream early.
+RANKER_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "best_index": {"type": "integer"},
+        "reasoning": {"type": "string"},
+        "scores": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer"},
+                    "occlusion_score": {"type": "integer"},
+                    "notes": {"type": "string"},
+                },
+                "required": ["index", "occlusion_score", "notes"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["best_index", "reasoning", "scores"],
+    "additionalProperties": False,
+}
+
+# Matches best_index in a partial ranker reply
+_BEST_INDEX_RE = re.compile(r'"best_index"\s*:\s*(\d+)\s*[,}]')
+# Only the most recent slice of the stream is scanned for it
+_BEST_INDEX_WINDOW = 256
+
+
+async def rank_images_with_gpt5(
     image_urls: List[str],
     product_names: List[str],
-    dimensions: Optional[Dict[str, Any]] = None
+    dimensions: Optional[Dict[str, Any]] = None,
+    on_best_url: Optional[Callable[[str], None]] = None,
 ) -> Dict[str, Any]:
     """
     Ask GPT-5 to pick the best image for the main object visibility criterion.
 
+    The reply is streamed. If `on_best_url` is given it is called (on the event loop) as
+    soon as the winning image has been emitted, while the model is still writing the scores,
+    so the caller can start downloading the image early. It is not called on a cache hit.
+
     Criteria restated:
      - Prefer an image where the primary object (as described by product_names) is fully visible.
      - Minimize objects IN FRONT OF or ON TOP OF the main object (occluders). Best is 0.
@@ -192,6 +364,44 @@ def rank_images_with_gpt5(
     if not image_urls:
         return {"image_url": None, "reasoning": "No images provided.", "scores": {}}
 
+    request = _rank_request(image_urls, product_names, dimensions)
+
+    async def _call() -> Dict[str, Any]:
+        await throttle(request)
+        stream = await client.chat.completions.create(**request, stream=True)
+
+        # Deltas go into a list and are joined once at the end. The early-exit scan looks at a
+        # bounded tail instead of re-joining everything so far, which would be O(n^2).
+        chunks: List[str] = []
+        tail = ""
+        announced = on_best_url is None
+        async for event in stream:
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if not delta:
+                continue
+            chunks.append(delta)
+            if not announced:
+                tail = (tail + delta)[-_BEST_INDEX_WINDOW:]
+                m = _BEST_INDEX_RE.search(tail)
+                if m:
+                    announced = True
+                    idx = int(m.group(1))
+                    if 0 <= idx < len(image_urls):
+                        on_best_url(image_urls[idx])
+
+        return _parse_ranking("".join(chunks).strip(), image_urls)
+
+    return await cached_call_async({"fn": "rank_images", **request}, _call)
+
+
+def _rank_request(
+    image_urls: List[str],
+    product_names: List[str],
+    dimensions: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Chat Completions request body for the image ranker."""
     # Keep prompt compact—pass just the list and constraints. We assume the model can “see” URLs
     # only descriptively; it will reason based on textual cues like filenames or path tokens.
     # (If you want actual visual inspection, pair with a vision model that fetches images.)
@@ -202,127 +412,176 @@ def rank_images_with_gpt5(
         " - Minimize objects covering/obscuring the main object (occlusions). Best is 0.\n"
         " - If tie: prefer front-facing, centered, entire object in frame.\n"
         " - Okay to have an image with measurement overlays.\n"
-        " - Output strictly in JSON with keys: best_image_url, reasoning, scores.\n"
-        "   Where 'scores' maps each URL to an object with: occlusion_score (integer; lower is better), notes.\n"
+        " - Images are given as an index -> URL map; refer to images ONLY by their integer index.\n"
+        " - Output strictly in JSON with keys: best_index, reasoning, scores.\n"
+        "   Where 'scores' lists each index with: occlusion_score (integer; lower is better), notes (brief).\n"
     )
 
     payload = {
         "product_names": product_names,
         "dimensions_hint": dimensions or {},
-        "image_urls": image_urls
+        "image_urls": {str(i): u for i, u in enumerate(image_urls)},
     }
 
-    resp = client.chat.completions.create(
-        model=MODEL_IMAGE_RANKER,
-        messages=[
+    return {
+        "model": MODEL_IMAGE_RANKER,
+        "messages": [
             {"role": "system", "content": "You are a meticulous product image judge."},
             {"role": "user", "content": instruction},
             {"role": "user", "content": f"Payload:\n{json.dumps(payload, ensure_ascii=False)}"}
         ],
-    )
-
-    content = resp.choices[0].message.content.strip()
-    try:
-        data = json.loads(content)
-    except Exception:
-        data = {}
-
-    best = {
-        "image_url": data.get("best_image_url"),
-        "reasoning": data.get("reasoning", ""),
-        "scores": data.get("scores", {})
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": "image_ranking", "schema": RANKER_SCHEMA, "strict": True},
+        },
     }
-    return best
 
 
-# pip install openai
-import os
-import json
-from typing import List, Dict, Optional
-from openai import OpenAI
-
-def choose_dimensions_with_gpt(
-    potential_dimension_values: List[str],
-    model: str = "gpt-5",
-) -> Dict[str, Optional[float]]:
+def _loads_model_json(content: str, what: str) -> Any:
     """
-    Given a list of noisy dimension strings, returns:
-    {
-      "length": float|None,  # inches
-      "width":  float|None,  # inches
-      "height": float|None   # inches
-    }
+    Parse a structured-output reply. Strict schemas mean anything unparseable is a real
+    failure (truncated stream, refusal), so log the raw text and raise rather than
+    carrying on with empty results; raising also keeps it out of the LLM cache.
     """
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    user = (
-        "Candidate dimension strings:\n"
-        + "\n".join(f"- {s}" for s in potential_dimension_values)
-        + "\n\nRules:\n"
-          "- Prefer explicitly labeled product/item dimensions.\n"
-          "- Prefer product/item over package/box dimensions.\n"
-          "- Resolve synonyms: depth=breadth=width (unless clearly LxWxH triplet says otherwise); height is vertical.\n"
-          "- Normalize to inches (1 in = 2.54 cm; 25.4 mm = 1 in).\n"
-          "- Return ONLY JSON per the schema—no extra text.\n"
-          "- Depth is the same as width.\n"
-          "Return a json in the format: {length: <length value>, width: <width value>, height: <height value>}"
-    )
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        logger.error("Unparseable %s reply from the model: %r", what, content)
+        raise
 
-    print("USER: ", user)
 
-    resp = client.responses.create(
-        model=model,
-        input=[{"role": "user", "content": user}],
-    )
+def _parse_ranking(content: str, image_urls: List[str]) -> Dict[str, Any]:
+    """Map the index-based reply back to URLs: {"image_url", "reasoning", "scores": {url: {...}}}."""
+    data = _loads_model_json(content, "ranker")
 
-    data = json.loads(resp.output_text)
+    def _url(i: Any) -> Optional[str]:
+        return image_urls[i] if isinstance(i, int) and 0 <= i < len(image_urls) else None
 
-    def _num(x):
-        return None if x is None else float(x)
+    scores = {}
+    for entry in data.get("scores") or []:
+        u = _url(entry.get("index"))
+        if u is not None:
+            scores[u] = {"occlusion_score": entry.get("occlusion_score"), "notes": entry.get("notes", "")}
 
-    return {
-        "length": _num(data.get("length")),
-        "width":  _num(data.get("width")),
-        "height": _num(data.get("height")),
+    best = {
+        "image_url": _url(data.get("best_index")),
+        "reasoning": data.get("reasoning", ""),
+        "scores": scores,
     }
+    return best
 
 
 import io
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
-def save_best_image(image_url: str, out_path: str = "best_image.png") -> str:
+# Image decode/encode + file writes get their own small pool so they never queue behind
+# the long-running Chrome scrapes sharing asyncio's default executor
+_IO_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-io")
+
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+_JPEG_MAGIC = b"\xff\xd8\xff"
+
+
+def _is_plain_png(data: bytes) -> bool:
+    """8-bit RGB/RGBA PNG, i.e. exactly what the decode/convert path below would produce."""
+    # IHDR is always the first chunk: bit depth at byte 24, colour type at byte 25 (2=RGB, 6=RGBA)
+    return data[:8] == _PNG_MAGIC and len(data) >= 26 and data[24] == 8 and data[25] in (2, 6)
+
+
+async def save_best_image(image_url: str, out_path: str = "best_image.png", keep_jpeg: bool = False) -> str:
     """
     Download image_url (any common format: jpg/png/webp/etc.) and save it as a PNG.
     Returns the output path. Raises on failure.
+
+    Sources that already are 8-bit RGB/RGBA PNGs are written through byte-for-byte. With
+    keep_jpeg=True a JPEG source is also written as-is, next to out_path with a .jpg
+    suffix (the returned path reflects that). Everything else is decoded and re-encoded.
     """
+    buf = await _fetch_image(image_url)
+    return await _write_image_async(buf, out_path, keep_jpeg)
+
+
+async def _fetch_image(image_url: str) -> io.BytesIO:
+    """Download image_url into memory (nothing touches disk)."""
     if not image_url:
         raise ValueError("image_url is empty.")
 
-    # Fetch bytes (follow redirects, set UA to avoid some 403s)
-    headers = {
-        "User-Agent": ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                       "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36")
-    }
-    r = requests.get(image_url, headers=headers, timeout=20)
-    r.raise_for_status()
+    # Fetch bytes over the shared HTTP/2 client (follows redirects, browser UA avoids some 403s).
+    # Stream straight into the decode buffer instead of materializing r.content first.
+    buf = io.BytesIO()
+    async with HTTP_CLIENT.stream("GET", image_url, timeout=20) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            buf.write(chunk)
+    return buf
+
+
+async def _write_image_async(buf: io.BytesIO, out_path: str, keep_jpeg: bool = False) -> str:
+    # File writes and the PIL decode/encode are blocking; keep them off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_POOL, _write_image, buf, out_path, keep_jpeg)
+
+
+def _write_image(buf: io.BytesIO, out_path: str, keep_jpeg: bool) -> str:
+    data = buf.getbuffer()
+    if _is_plain_png(data):
+        with open(out_path, "wb") as f:
+            f.write(data)
+        return out_path
+    if keep_jpeg and data[:3] == _JPEG_MAGIC:
+        jpg_path = os.path.splitext(out_path)[0] + ".jpg"
+        with open(jpg_path, "wb") as f:
+            f.write(data)
+        return jpg_path
+    del data  # release the memoryview so PIL can read from buf
 
     # Decode and normalize to PNG
-    img = Image.open(io.BytesIO(r.content))
+    buf.seek(0)
+    img = Image.open(buf)
     if img.mode not in ("RGB", "RGBA"):
         # If it has an alpha channel, keep it; otherwise convert to RGB
         img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
 
-    img.save(out_path, format="PNG", optimize=True)
+    # Fast zlib level: optimize=True costs ~10x the CPU for a <1% smaller file
+    img.save(out_path, format="PNG", compress_level=1)
     return out_path
 
 
-def get_best_image_url(url):
+def _dumps_pretty(obj: Any) -> str:
+    """Indented JSON via orjson (much faster than json.dumps(indent=2)); Paths etc. become str."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode()
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Select the best product image with minimal occlusions.")
-    # parser.add_argument("url", help="Product URL to analyze")
+    parser.add_argument("url", nargs="?", help="Product URL to analyze")
     parser.add_argument("--max-images", type=int, default=30, help="Cap the number of candidate image URLs")
     parser.add_argument("--print-scrape", action="store_true", help="Print raw scraper payload to stderr")
-    args = parser.parse_args()
+    parser.add_argument("-v", "--verbose", action="store_true", help="Debug logging (model outputs, payloads)")
+    parser.add_argument("--batch", metavar="URLS_TXT",
+                        help="File with one product URL per line; run all of them through the OpenAI Batch API")
+    parser.add_argument("--batch-out", default="batch_results.jsonl",
+                        help="Where --batch writes one JSON result per line")
+    return parser
+
+
+# Where get_best_image_url saves the chosen image by default (read by the IS-Net step)
+BEST_IMAGE_OUT_PATH = "C:\\Users\\davin\\OneDrive\\Documents\\PreviewAR\\IS-Net\\best_image.png"
+
+
+def get_best_image_url(
+    url: str,
+    max_images: int = 30,
+    print_scrape: bool = False,
+    out_path: Optional[str] = BEST_IMAGE_OUT_PATH,
+) -> Optional[str]:
+    """
+    Run the full pipeline for one product URL, print the result JSON, save the best
+    image to `out_path` (skipped if None) and return the best image URL.
+
+    Plain library function: CLI parsing lives under __main__.
+    """
 
     # Amazon
 
@@ -348,32 +607,88 @@ def get_best_image_url(url):
     # )
 
 
-    # 1) URL info via your helper (already uses GPT-5 per your description)
-    info = extract_with_gpt5(url)
-    if not isinstance(info, dict):
-        print("ERROR: extract_with_gpt5 did not return a dict.", file=sys.stderr)
-        sys.exit(2)
+    result = get_best_image_result(url, max_images=max_images, print_scrape=print_scrape, out_path=out_path)
+    return result["best_image"]["image_url"]
 
-    company = info.get("company_name") or ""
-    seed_names = info.get("product_name") or []
-    if not isinstance(seed_names, list):
-        seed_names = [str(seed_names)]
 
-    # 2) Scrape using your scraper
-    scrape_payload = scrape_main(url, company)
-    if args.print_scrape:
-        print("=== RAW SCRAPE PAYLOAD ===", file=sys.stderr)
-        print(json.dumps(scrape_payload, indent=2, ensure_ascii=False), file=sys.stderr)
+def get_best_image_result(
+    url: str,
+    max_images: int = 30,
+    print_scrape: bool = False,
+    out_path: Optional[str] = BEST_IMAGE_OUT_PATH,
+) -> Dict[str, Any]:
+    """
+    Like get_best_image_url but returns the full result dict, including the extract's
+    company_name and seed_product_names, so callers don't need their own extract call.
+    """
+    return run_sync(_select_best_image(
+        url, max_images=max_images, print_scrape=print_scrape, out_path=out_path,
+    ))
+
+
+async def _select_best_image(
+    url: str,
+    max_images: int = 30,
+    print_scrape: bool = False,
+    out_path: Optional[str] = None,
+    pending_saves: Optional[List[asyncio.Task]] = None,
+    scrape_prefix: str = "page",
+) -> Dict[str, Any]:
+    """
+    Async body of get_best_image_url; blocking helpers run in worker threads.
+    Returns the result dict and, if `out_path` is given, saves the best image there.
+    If `pending_saves` is given the save task is appended to it instead of awaited,
+    so the caller can return before the download finishes. Concurrent runs need
+    distinct `scrape_prefix`es so their scraper dumps don't clobber each other.
+    """
+    # The scraper only uses `company` to switch on Amazon/IKEA handling, which the domain
+    # already decides, so start it right away instead of waiting on the GPT extract.
+    brand_hint = domain_to_brand(url) or ""
+    scrape_task = asyncio.create_task(asyncio.to_thread(scrape_main, url, brand_hint, scrape_prefix))
 
-    print("Scrape payload: ", scrape_payload)
+    try:
+        # 1) URL info via your helper (already uses GPT-5 per your description)
+        title = await fetch_title(url)
+        # `or ""` so a failed title fetch isn't retried inside extract_with_gpt5
+        info = await extract_with_gpt5_async(url, title or "")
+        if not isinstance(info, dict):
+            # Not sys.exit(): SystemExit raised on the loop thread would never reach the caller.
+            raise RuntimeError("extract_with_gpt5 did not return a dict.")
+
+        company = info.get("company_name") or brand_hint
+        seed_names = info.get("product_name") or []
+        if not isinstance(seed_names, list):
+            seed_names = [str(seed_names)]
+
+        # 2) Scrape using your scraper
+        scrape_payload = await scrape_task
+    except Exception:
+        # Let the Chrome scrape finish inside the caller's concurrency slot (run_many) and
+        # retrieve its result/error; the exception being raised is the one to report
+        await asyncio.gather(scrape_task, return_exceptions=True)
+        raise
+    except BaseException:
+        # Cancelled: don't block on the thread, but still retrieve its eventual error
+        scrape_task.cancel()
+        scrape_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        raise
+    if print_scrape:
+        print("=== RAW SCRAPE PAYLOAD ===", file=sys.stderr)
+        print(_dumps_pretty(scrape_payload), file=sys.stderr)
+    elif logger.isEnabledFor(logging.DEBUG):
+        # Only pay for formatting the (multi-KB) payload when someone will read it
+        logger.debug("Scrape payload: %s", _dumps_pretty(scrape_payload))
 
     # Parse JSON string -> dict
-    data = json.loads(scrape_payload[0])
+    data = orjson.loads(scrape_payload[0])
 
-    # Get images
-    image_urls = data.get("image_urls", [])
+    # Get images (deduped, capped at max_images)
+    image_urls = normalize_url_list(data.get("image_urls", []), max_images)
 
-    original_dim = choose_dimensions_with_gpt(data.get("potential_dimension_values", []))
+    # 3a) Expand aliases and pick dimensions (one GPT call)
+    expanded_names, original_dim = await combined_enrich_with_gpt5(
+        seed_names, data.get("potential_dimension_values", [])
+    )
 
     dimensions = {
         "length": original_dim.get("length"),
@@ -381,16 +696,38 @@ def get_best_image_url(url):
         "height": original_dim.get("height"),
     }
 
-    # 3a) Expand aliases
-    expanded_names = expand_product_aliases_via_gpt5(seed_names)
+    # 3b) Rank images per your criteria; the download starts as soon as the ranker names
+    # the winner, overlapping the rest of its streamed reply. It is only written to
+    # out_path once the ranking has fully succeeded.
+    fetch_task: Optional[asyncio.Task] = None
 
-    # 3b) Rank images per your criteria
-    best = rank_images_with_gpt5(image_urls, expanded_names, dimensions)
+    def _start_fetch(image_url: str) -> None:
+        nonlocal fetch_task
+        if out_path and image_url and fetch_task is None:
+            fetch_task = asyncio.create_task(_fetch_image(image_url))
+
+    try:
+        best = await rank_images_with_gpt5(image_urls, expanded_names, dimensions, on_best_url=_start_fetch)
+    except BaseException:
+        # A failed ranking must not leave a background download behind (or its error unretrieved)
+        if fetch_task is not None:
+            fetch_task.cancel()
+            fetch_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        raise
+    _start_fetch(best.get("image_url"))  # cache hit / field never matched mid-stream
+
+    save_task: Optional[asyncio.Task] = None
+    if fetch_task is not None:
+        async def _save(fetch: asyncio.Task) -> str:
+            return await _write_image_async(await fetch, out_path)
+
+        save_task = asyncio.create_task(_save(fetch_task))
 
     # Final JSON result
     result = {
         "url": url,
         "company_name": company,
+        "seed_product_names": seed_names,
         "product_names": expanded_names,
         "dimensions": dimensions,
         "all_image_urls": image_urls,
@@ -401,10 +738,258 @@ def get_best_image_url(url):
         "scores": best.get("scores", {})
     }
 
-    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(_dumps_pretty(result))
+
+    if save_task is not None:
+        if pending_saves is not None:
+            pending_saves.append(save_task)
+        else:
+            await save_task
+    return result
+
+
+async def _run_many(
+    urls: List[str],
+    rpm: int,
+    tpm: int,
+    max_parallel: int,
+    max_images: int,
+    out_dir: Optional[str],
+) -> List[Optional[Dict[str, Any]]]:
+    # Built here, on the shared loop: before 3.10 asyncio.Lock binds to the loop current
+    # at construction, so one made on the caller's thread breaks under contention
+    RATE_LIMITER.set(RateLimiter(rpm, tpm))
+    sem = asyncio.Semaphore(max_parallel)
+
+    async def _one(i: int, u: str) -> Optional[Dict[str, Any]]:
+        # The image download finishes outside the semaphore so the next URL's scrape
+        # doesn't wait on it
+        saves: List[asyncio.Task] = []
+        async with sem:
+            out_path = os.path.join(out_dir, f"best_image_{i}.png") if out_dir else None
+            try:
+                result = await _select_best_image(
+                    u, max_images=max_images, out_path=out_path, pending_saves=saves,
+                    scrape_prefix=f"page_{i}",
+                )
+            except Exception as e:
+                print(f"WARNING: pipeline failed for {u}: {e}", file=sys.stderr)
+                return None
+        try:
+            await asyncio.gather(*saves)
+        except Exception as e:
+            print(f"WARNING: saving best image failed for {u}: {e}", file=sys.stderr)
+        return result
+
+    return await asyncio.gather(*(_one(i, u) for i, u in enumerate(urls)))
+
+
+def run_many(
+    urls: List[str],
+    rpm: int = 500,
+    tpm: int = 500_000,
+    max_parallel: int = 4,
+    max_images: int = 30,
+    out_dir: Optional[str] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Run the live pipeline over many URLs concurrently.
+
+    At most `max_parallel` pipelines (and so Chrome instances) run at once, and every GPT
+    call first waits on a shared token bucket sized to the account's `rpm`/`tpm` limits, so
+    throughput stays near the rate limit instead of tripping 429s. Returns one result dict
+    per URL (None where that URL failed); best images are saved to `out_dir` if given.
+    """
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    return run_sync(_run_many(urls, rpm, tpm, max_parallel, max_images, out_dir))
+
+
+# ----------------------------------------------------------------------
+# OFFLINE BATCH MODE (OpenAI Batch API)
+# ----------------------------------------------------------------------
 
-    save_best_image(best.get("image_url"), out_path="C:\\Users\\davin\\OneDrive\\Documents\\PreviewAR\\IS-Net\\best_image.png")
+BATCH_POLL_SECONDS = 30
+_BATCH_DONE = ("completed", "failed", "expired", "cancelled")
+
+
+def _batch_output_text(body: Dict[str, Any]) -> str:
+    """Pull the model text out of a raw /v1/chat/completions or /v1/responses body."""
+    if "choices" in body:
+        return (body["choices"][0]["message"]["content"] or "").strip()
+    parts = []
+    for item in body.get("output", []):
+        for c in item.get("content") or []:
+            if c.get("type") == "output_text":
+                parts.append(c.get("text", ""))
+    return "".join(parts).strip()
+
+
+async def _submit_batch(endpoint: str, requests: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Upload one JSONL request file for `endpoint`, wait for the batch to finish and return
+    {custom_id: output_text}. Requests that failed inside the batch are simply missing.
+    """
+    if not requests:
+        return {}
+
+    lines = [
+        json.dumps({"custom_id": cid, "method": "POST", "url": endpoint, "body": body}, ensure_ascii=False)
+        for cid, body in requests.items()
+    ]
+    upload = await client.files.create(
+        file=("batch_requests.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch",
+    )
+    batch = await client.batches.create(
+        input_file_id=upload.id,
+        endpoint=endpoint,
+        completion_window="24h",
+    )
+    print(f"Submitted batch {batch.id} ({len(requests)} requests to {endpoint})", file=sys.stderr)
+
+    while batch.status not in _BATCH_DONE:
+        await asyncio.sleep(BATCH_POLL_SECONDS)
+        batch = await client.batches.retrieve(batch.id)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"WARNING: batch {batch.id} ended with status {batch.status}", file=sys.stderr)
+        return {}
+
+    content = await client.files.content(batch.output_file_id)
+    out: Dict[str, str] = {}
+    for line in content.text.splitlines():
+        if not line.strip():
+            continue
+        row = orjson.loads(line)
+        resp = row.get("response") or {}
+        if resp.get("status_code") == 200:
+            out[row["custom_id"]] = _batch_output_text(resp.get("body") or {})
+    return out
+
+
+async def _submit_batches(requests: Dict[str, Tuple[str, Dict[str, Any]]]) -> Dict[str, str]:
+    """A batch file may only target one endpoint, so split by endpoint and submit them side by side."""
+    by_endpoint: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for cid, (endpoint, body) in requests.items():
+        by_endpoint.setdefault(endpoint, {})[cid] = body
+    merged: Dict[str, str] = {}
+    for part in await asyncio.gather(*(_submit_batch(ep, reqs) for ep, reqs in by_endpoint.items())):
+        merged.update(part)
+    return merged
+
+
+def _scrape_all(urls: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """Scrape sequentially (one Chrome at a time); failures become None."""
+    out: List[Optional[Dict[str, Any]]] = []
+    for u in urls:
+        try:
+            out.append(orjson.loads(scrape_main(u, domain_to_brand(u) or "")[0]))
+        except Exception as e:
+            print(f"WARNING: scrape failed for {u}: {e}", file=sys.stderr)
+            out.append(None)
+    return out
+
+
+async def _run_batch(urls: List[str], max_images: int) -> List[Dict[str, Any]]:
+    """
+    Same pipeline as get_best_image_url, but each GPT stage is submitted for all URLs
+    at once through the Batch API (half the cost; bounded by the 24h window, not QPS).
+    Custom ids are "<url index>:<call>" so results reassemble per URL.
+
+    Stage 1: extract (per URL)            -- Selenium scrapes run while this batch is pending
+    Stage 2: aliases + dimensions (one combined call)
+    Stage 3: image ranking
+    """
+    titles = await asyncio.gather(*(fetch_title(u) for u in urls))
+
+    scrape_task = asyncio.create_task(asyncio.to_thread(_scrape_all, urls))
+    stage1 = await _submit_batches({
+        f"{i}:extract": ("/v1/responses", build_extract_request(u, t))
+        for i, (u, t) in enumerate(zip(urls, titles))
+    })
+    scraped = await scrape_task
+
+    infos: List[Dict[str, Any]] = []
+    for i, u in enumerate(urls):
+        try:
+            infos.append(parse_extract_output(stage1[f"{i}:extract"]))
+        except (KeyError, ValueError):
+            infos.append({"company_name": domain_to_brand(u) or "", "product_name": []})
+
+    stage2_requests: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for i, info in enumerate(infos):
+        seeds = info.get("product_name") or []
+        if not isinstance(seeds, list):
+            seeds = [str(seeds)]
+            info["product_name"] = seeds
+        dim_values = (scraped[i] or {}).get("potential_dimension_values", [])
+        if seeds or dim_values:
+            stage2_requests[f"{i}:enrich"] = ("/v1/responses", _enrich_request(seeds, dim_values))
+    stage2 = await _submit_batches(stage2_requests)
+
+    names: List[List[str]] = []
+    dims: List[Dict[str, Optional[float]]] = []
+    images: List[List[str]] = []
+    stage3_requests: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for i, info in enumerate(infos):
+        try:
+            n, d = _parse_enrich(stage2[f"{i}:enrich"], info["product_name"])
+        except (KeyError, ValueError, TypeError):
+            n = sorted({str(x).strip().lower() for x in info["product_name"]})
+            d = {"length": None, "width": None, "height": None}
+        names.append(n)
+        dims.append(d)
+        images.append(normalize_url_list((scraped[i] or {}).get("image_urls", []), max_images))
+        if images[i]:
+            stage3_requests[f"{i}:rank"] = ("/v1/chat/completions", _rank_request(images[i], names[i], dims[i]))
+    stage3 = await _submit_batches(stage3_requests)
+
+    results = []
+    for i, u in enumerate(urls):
+        if f"{i}:rank" in stage3:
+            try:
+                best = _parse_ranking(stage3[f"{i}:rank"], images[i])
+            except ValueError:
+                best = {"image_url": None, "reasoning": "Ranker reply was not valid JSON.", "scores": {}}
+        else:
+            best = {"image_url": None, "reasoning": "No images provided.", "scores": {}}
+        results.append({
+            "url": u,
+            "company_name": infos[i].get("company_name") or "",
+            "seed_product_names": infos[i].get("product_name") or [],
+            "product_names": names[i],
+            "dimensions": dims[i],
+            "all_image_urls": images[i],
+            "best_image": {
+                "image_url": best.get("image_url"),
+                "reasoning": best.get("reasoning"),
+            },
+            "scores": best.get("scores", {}),
+        })
+    return results
+
+
+def run_batch(urls_path: str, out_path: str = "batch_results.jsonl", max_images: int = 30) -> List[Dict[str, Any]]:
+    """Read one URL per line from `urls_path`, run the batch pipeline and write JSONL results to `out_path`."""
+    with open(urls_path, "r", encoding="utf-8") as f:
+        urls = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+    results = run_sync(_run_batch(urls, max_images))
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        for r in results:
+            f.write(orjson.dumps(r).decode() + "\n")
+    print(f"Wrote {len(results)} results to {out_path}", file=sys.stderr)
+    return results
 
 
 if __name__ == "__main__":
-    get_best_image_url()
+    cli_args = _build_arg_parser().parse_args()
+    logging.basicConfig(level=logging.DEBUG if cli_args.verbose else logging.WARNING)
+    if cli_args.batch:
+        run_batch(cli_args.batch, out_path=cli_args.batch_out, max_images=cli_args.max_images)
+    elif cli_args.url:
+        get_best_image_url(cli_args.url, max_images=cli_args.max_images, print_scrape=cli_args.print_scrape)
+    else:
+        _build_arg_parser().error("pass a product URL or --batch URLS_TXT")
@@ -1,17 +1,20 @@
 #!/usr/bin/env python3
+import functools
+import html
+import logging
 import os
 import json
 import sys
 import re
-from typing import Optional, Dict
+from typing import Optional, Dict, Any
 from urllib.parse import urlparse
 
-import requests
-from bs4 import BeautifulSoup
+import orjson
 import tldextract
 
-# OpenAI SDK (Responses API)
-from openai import OpenAI  # pip install openai
+from async_clients import HTTP_CLIENT, openai_client, run_sync
+from llm_cache import cached_call_async
+from rate_limit import throttle
 
 """
 Usage:
@@ -23,24 +26,49 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-def fetch_title(url: str, timeout: int = 10) -> Optional[str]:
-    """Best-effort fetch of the page title to boost GPT accuracy."""
+logger = logging.getLogger(__name__)
+
+_SPACE_RE = re.compile(r"\s+")
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_TITLE_SCAN_BYTES = 64 * 1024  # <title> lives in <head>; never read past this
+_WS_SUB = re.compile(r"[-_]").sub
+
+# A few hand-tuned brand fixes for domain_to_brand
+_BRAND_FIXES = {
+    "Ikea": "IKEA",
+    "Wayfair": "Wayfair",
+    "Amazon": "Amazon",
+    "Ebay": "eBay",
+    "Best buy": "Best Buy",
+    "Crateandbarrel": "Crate & Barrel",
+}
+
+async def fetch_title(url: str, timeout: int = 10) -> Optional[str]:
+    """
+    Best-effort fetch of the page title to boost GPT accuracy.
+
+    Streams the response and stops as soon as </title> shows up (or after the first
+    64 KB) instead of downloading and DOM-parsing the whole, often multi-MB, page.
+    Runs on the shared async HTTP/2 client; from sync code use run_sync(fetch_title(url)).
+    """
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            )
-        }
-        r = requests.get(url, headers=headers, timeout=timeout)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        title = soup.title.string.strip() if soup.title and soup.title.string else None
+        async with HTTP_CLIENT.stream("GET", url, timeout=timeout) as r:
+            r.raise_for_status()
+            buf = bytearray()
+            m = None
+            async for chunk in r.aiter_bytes():
+                buf += chunk
+                m = _TITLE_RE.search(buf)
+                if m or len(buf) >= _TITLE_SCAN_BYTES:
+                    break
+            charset = r.charset_encoding or "utf-8"
+        if not m:
+            return None
+        title = html.unescape(m.group(1).decode(charset, errors="replace")).strip()
         # Trim excessive whitespace
         if title:
-            title = re.sub(r"\s+", " ", title)
-        return title
+            title = _SPACE_RE.sub(" ", title)
+        return title or None
     except Exception:
         return None
 
@@ -49,33 +77,53 @@ def domain_to_brand(url: str) -> Optional[str]:
     Lightweight brand guess from domain (used as a hint, GPT still decides).
     """
     try:
-        ext = tldextract.extract(url)
-        domain = ext.domain
-        if not domain:
-            return None
-        # Simple prettify: 'bestbuy' -> 'Best Buy'
-        brand = re.sub(r"[-_]", " ", domain).strip()
-        brand = brand.capitalize() if " " not in brand else " ".join(w.capitalize() for w in brand.split())
-        # A few hand-tuned fixes
-        fixes = {
-            "Ikea": "IKEA",
-            "Wayfair": "Wayfair",
-            "Amazon": "Amazon",
-            "Ebay": "eBay",
-            "Best buy": "Best Buy",
-            "Crateandbarrel": "Crate & Barrel",
-        }
-        return fixes.get(brand, brand)
+        return _brand_for_host(urlparse(url).hostname or url)
     except Exception:
         return None
 
-def extract_with_gpt5(url: str) -> Dict[str, str]:
+@functools.lru_cache(maxsize=4096)
+def _brand_for_host(host: str) -> Optional[str]:
+    # Memoized per hostname: product URLs rarely repeat, but bulk runs hit the same
+    # handful of retailer hosts over and over.
+    ext = tldextract.extract(host)
+    domain = ext.domain
+    if not domain:
+        return None
+    # Simple prettify: 'bestbuy' -> 'Best Buy'
+    brand = _WS_SUB(" ", domain).strip()
+    brand = brand.capitalize() if " " not in brand else " ".join(w.capitalize() for w in brand.split())
+    return _BRAND_FIXES.get(brand, brand)
+
+def extract_with_gpt5(url: str, title: Optional[str] = None) -> Dict[str, str]:
     """
     Calls GPT-5 (Responses API) with structured outputs to extract:
     { "company_name": str, "product_name": str }
+
+    Pass `title` if the caller already fetched it (e.g. concurrently with other work);
+    otherwise it is fetched here. Sync wrapper around extract_with_gpt5_async.
     """
+    return run_sync(extract_with_gpt5_async(url, title))
+
+async def extract_with_gpt5_async(url: str, title: Optional[str] = None) -> Dict[str, str]:
+    """Coroutine version of extract_with_gpt5 for code already on the shared loop."""
     # Optional context to improve accuracy
-    title = fetch_title(url)
+    if title is None:
+        title = await fetch_title(url)
+    request = build_extract_request(url, title)
+
+    async def _call() -> Dict[str, str]:
+        await throttle(request)  # inside _call: cache hits don't spend rate-limit budget
+        # Strict JSON schema for structured outputs
+        response = await openai_client().responses.create(**request)
+
+        logger.debug("Output text: %s", response.output_text)
+
+        return parse_extract_output(response.output_text)
+
+    return await cached_call_async({"fn": "extract_with_gpt5", **request}, _call)
+
+def build_extract_request(url: str, title: Optional[str]) -> Dict[str, Any]:
+    """Responses API request body for extract_with_gpt5 (also used by the batch runner)."""
     brand_hint = domain_to_brand(url)
     parsed = urlparse(url)
 
@@ -94,22 +142,19 @@ def extract_with_gpt5(url: str) -> Dict[str, str]:
         ),
     }
 
-    client = OpenAI()  # Reads OPENAI_API_KEY from env
-
-    # Strict JSON schema for structured outputs
-    response = client.responses.create(
-        model="gpt-5",
-        input=[
+    return {
+        "model": "gpt-5",
+        "input": [
             {
                 "role": "user",
                 "content": json.dumps(user_context),
             },
         ],
-    )
-
-    print("Output text: ", response.output_text)
+    }
 
-    data = json.loads(response.output_text)
+def parse_extract_output(text: str) -> Dict[str, str]:
+    """Parse the model's JSON reply into {"company_name", "product_name"}."""
+    data = orjson.loads(text)
     # Minimal sanity check
     if not isinstance(data, dict) or "company_name" not in data or "product_name" not in data:
         raise ValueError("Model did not return the expected fields.")
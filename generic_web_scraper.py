@@ -1,21 +1,39 @@
 #!/usr/bin/env python3
-import sys
+import atexit
+import functools
+import io
+import logging
+import os
+import queue
 import re
+import sys
+import threading
 import time
 import random
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl  # POSIX only; without it Chrome falls back to a throwaway profile
+except ImportError:
+    fcntl = None  # type: ignore
 
 from dotenv import load_dotenv
+from lxml import html as lxml_html  # pip install lxml
+import orjson  # pip install orjson
 from openai import OpenAI
 
+from llm_cache import cached_call
+from rate_limit import throttle_sync
 from selenium import webdriver
 from selenium.common.exceptions import (
     TimeoutException,
-    NoSuchElementException,
     ElementNotInteractableException,
     WebDriverException,
     JavascriptException,
+    StaleElementReferenceException,
 )
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -25,6 +43,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # ----------------------------------------------------------------------
 # PRESS & HOLD / CAPTCHA HELPERS (Wayfair etc.)
 # ----------------------------------------------------------------------
@@ -41,7 +61,7 @@ _PRESS_HOLD_XPATH = (
 )
 
 def _find_in_iframes(driver, by, value, timeout: float = 6.0):
-    """Return (element, frame_index or None)."""
+    """Return (element, frame element or None)."""
     wait = WebDriverWait(driver, timeout)
     # main document
     try:
@@ -52,12 +72,12 @@ def _find_in_iframes(driver, by, value, timeout: float = 6.0):
 
     # search in iframes
     frames = driver.find_elements(By.CSS_SELECTOR, "iframe, frame")
-    for i, fr in enumerate(frames):
+    for fr in frames:
         try:
             driver.switch_to.frame(fr)
             try:
                 el = wait.until(EC.presence_of_element_located((by, value)))
-                return el, i
+                return el, fr
             except TimeoutException:
                 pass
         finally:
@@ -66,17 +86,17 @@ def _find_in_iframes(driver, by, value, timeout: float = 6.0):
 
 
 def _mouse_press_and_hold(driver, el, duration: float):
-    actions = ActionChains(driver)
-    actions.move_to_element(el).perform()
-    time.sleep(0.12)
-    actions.click_and_hold(el).perform()
-    t_end = time.time() + duration
-    while time.time() < t_end:
-        ActionChains(driver).move_by_offset(
-            random.randint(-2, 2), random.randint(-2, 2)
-        ).perform()
-        time.sleep(0.12 + random.random() * 0.15)
-    ActionChains(driver).release(el).perform()
+    # The whole gesture (including the small jitter moves) is one W3C action sequence,
+    # so the browser does the timing and it costs a single round-trip instead of one per
+    # step. duration=0 makes each jitter move instantaneous; the pauses carry the time.
+    actions = ActionChains(driver, duration=0)
+    actions.move_to_element(el).pause(0.12).click_and_hold(el)
+    held = 0.0
+    while held < duration:
+        step = min(0.12 + random.random() * 0.15, duration - held)
+        actions.pause(step).move_by_offset(random.randint(-2, 2), random.randint(-2, 2))
+        held += step
+    actions.release(el).perform()
 
 
 def _js_pointer_press_and_hold(driver, el, duration: float):
@@ -131,15 +151,14 @@ def press_and_hold(
     by, val = locator if locator else (By.XPATH, _PRESS_HOLD_XPATH)
 
     # Find element (main or iframes)
-    el, frame_idx = _find_in_iframes(driver, by, val, timeout=timeout)
+    el, frame = _find_in_iframes(driver, by, val, timeout=timeout)
     if not el:
         return False
 
     # Switch into the frame if needed
-    if frame_idx is not None:
-        frames = driver.find_elements(By.CSS_SELECTOR, "iframe, frame")
+    if frame is not None:
         try:
-            driver.switch_to.frame(frames[frame_idx])
+            driver.switch_to.frame(frame)
         except Exception:
             driver.switch_to.default_content()
 
@@ -171,6 +190,56 @@ def press_and_hold(
 # AMAZON BOT SAFEGUARD HANDLER
 # ----------------------------------------------------------------------
 
+# Elements that only exist on a real product page
+_PRODUCT_INDICATORS = (
+    "#productTitle",
+    "#landingImage",
+    "#productDetails_techSpec_section_1",
+    "#add-to-cart-button",
+    "[data-asin]",
+)
+
+# Buttons that get past Amazon's "continue shopping" / bot-check interstitials
+_SAFEGUARD_PATTERNS = (
+    (By.XPATH, "//button[contains(., 'Continue shopping')]"),
+    (By.XPATH, "//button[contains(., 'Show me the product')]"),
+    (By.XPATH, "//button[contains(., 'Proceed')]"),
+    (By.XPATH, "//button[contains(., 'Continue')]"),
+    (By.XPATH, "//button[contains(., 'Try a different image')]"),
+    (By.XPATH, "//a[contains(., 'Continue shopping')]"),
+    (By.XPATH, "//a[contains(., 'Show me the product')]"),
+    (By.XPATH, "//input[@type='submit' and contains(@value, 'Continue')]"),
+
+    # CAPTCHA-related
+    (By.CSS_SELECTOR, "button[id*='captcha']"),
+    (By.CSS_SELECTOR, "button[class*='captcha']"),
+    (By.CSS_SELECTOR, "button[id*='verify']"),
+    (By.CSS_SELECTOR, "button[class*='verify']"),
+
+    # Common Amazon safeguard button IDs and classes
+    (By.CSS_SELECTOR, "#continue-button"),
+    (By.CSS_SELECTOR, "#continue"),
+    (By.CSS_SELECTOR, ".a-button-primary"),
+    (By.CSS_SELECTOR, "button[data-action='continue']"),
+    (By.CSS_SELECTOR, "button[aria-label*='Continue']"),
+
+    # Generic submit buttons in forms
+    (By.CSS_SELECTOR, "form button[type='submit']"),
+    (By.CSS_SELECTOR, "form input[type='submit']"),
+)
+
+# Combined once so the handler needs one query per locator type
+_SAFEGUARD_XPATH = " | ".join(sel for by, sel in _SAFEGUARD_PATTERNS if by == By.XPATH)
+_SAFEGUARD_CSS = ", ".join(sel for by, sel in _SAFEGUARD_PATTERNS if by == By.CSS_SELECTOR)
+
+_FIRST_PRESENT_JS = "return arguments[0].find(s => document.querySelector(s) !== null) || null;"
+
+
+def _first_present(driver, selectors) -> Optional[str]:
+    """First CSS selector in `selectors` that matches the page, tested in one browser round-trip."""
+    return driver.execute_script(_FIRST_PRESENT_JS, list(selectors))
+
+
 def handle_amazon_bot_safeguard(driver, timeout: int = 15) -> bool:
     """
     Handle Amazon's bot detection / safeguard buttons that appear before
@@ -180,61 +249,28 @@ def handle_amazon_bot_safeguard(driver, timeout: int = 15) -> bool:
         bool: True if safeguard was handled successfully or not present, False otherwise
     """
     try:
-        time.sleep(2)
+        WebDriverWait(driver, 5).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
 
         # Check if we're already on the product page (no safeguard needed)
-        product_indicators = [
-            "#productTitle",
-            "#landingImage",
-            "#productDetails_techSpec_section_1",
-            "#add-to-cart-button",
-            "[data-asin]",
-        ]
-
-        for indicator in product_indicators:
-            try:
-                driver.find_element(By.CSS_SELECTOR, indicator)
-                print(f"Already on product page (found {indicator})")
-                return True
-            except NoSuchElementException:
-                continue
-
-        safeguard_patterns = [
-            (By.XPATH, "//button[contains(., 'Continue shopping')]"),
-            (By.XPATH, "//button[contains(., 'Show me the product')]"),
-            (By.XPATH, "//button[contains(., 'Proceed')]"),
-            (By.XPATH, "//button[contains(., 'Continue')]"),
-            (By.XPATH, "//button[contains(., 'Try a different image')]"),
-            (By.XPATH, "//a[contains(., 'Continue shopping')]"),
-            (By.XPATH, "//a[contains(., 'Show me the product')]"),
-            (By.XPATH, "//input[@type='submit' and contains(@value, 'Continue')]"),
-
-            # CAPTCHA-related
-            (By.CSS_SELECTOR, "button[id*='captcha']"),
-            (By.CSS_SELECTOR, "button[class*='captcha']"),
-            (By.CSS_SELECTOR, "button[id*='verify']"),
-            (By.CSS_SELECTOR, "button[class*='verify']"),
-
-            # Common Amazon safeguard button IDs and classes
-            (By.CSS_SELECTOR, "#continue-button"),
-            (By.CSS_SELECTOR, "#continue"),
-            (By.CSS_SELECTOR, ".a-button-primary"),
-            (By.CSS_SELECTOR, "button[data-action='continue']"),
-            (By.CSS_SELECTOR, "button[aria-label*='Continue']"),
-
-            # Generic submit buttons in forms
-            (By.CSS_SELECTOR, "form button[type='submit']"),
-            (By.CSS_SELECTOR, "form input[type='submit']"),
-        ]
+        indicator = _first_present(driver, _PRODUCT_INDICATORS)
+        if indicator:
+            print(f"Already on product page (found {indicator})")
+            return True
+
+        # One union query per locator type instead of a 3 s wait per pattern: the page has
+        # loaded by now, so a button is either there or not. XPath (text) matches first.
+        candidates = (
+            driver.find_elements(By.XPATH, _SAFEGUARD_XPATH)
+            + driver.find_elements(By.CSS_SELECTOR, _SAFEGUARD_CSS)
+        )
 
         button_clicked = False
-        for by, selector in safeguard_patterns:
+        for element in candidates:
             try:
-                element = WebDriverWait(driver, 3).until(
-                    EC.presence_of_element_located((by, selector))
-                )
                 if element.is_displayed() and element.is_enabled():
-                    print(f"Found safeguard button: {selector}")
+                    print(f"Found safeguard button: <{element.tag_name}> {element.text.strip()[:40]!r}")
                     driver.execute_script(
                         "arguments[0].scrollIntoView(true);", element
                     )
@@ -247,24 +283,24 @@ def handle_amazon_bot_safeguard(driver, timeout: int = 15) -> bool:
                     button_clicked = True
                     print("Clicked safeguard button")
                     break
-            except (TimeoutException, NoSuchElementException):
+            except StaleElementReferenceException:
                 continue
 
         if button_clicked:
-            time.sleep(3)
-            for indicator in product_indicators:
-                try:
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located(
-                            (By.CSS_SELECTOR, indicator)
-                        )
-                    )
-                    print(
-                        f"Successfully navigated to product page (found {indicator})"
-                    )
-                    return True
-                except TimeoutException:
-                    continue
+            try:
+                # One JS probe per poll for all indicators (was up to 10 s per indicator).
+                # Probes that land mid-navigation fail with a JS error; keep polling.
+                indicator = WebDriverWait(
+                    driver, 10, poll_frequency=0.25, ignored_exceptions=(JavascriptException,)
+                ).until(
+                    lambda d: _first_present(d, _PRODUCT_INDICATORS)
+                )
+                print(
+                    f"Successfully navigated to product page (found {indicator})"
+                )
+                return True
+            except TimeoutException:
+                pass
 
             current_url = driver.current_url
             if "amazon.com/dp/" in current_url or "amazon.com/product/" in current_url:
@@ -275,12 +311,8 @@ def handle_amazon_bot_safeguard(driver, timeout: int = 15) -> bool:
             print(
                 "No safeguard button found - may already be on product page or safeguard not present"
             )
-            for indicator in product_indicators:
-                try:
-                    driver.find_element(By.CSS_SELECTOR, indicator)
-                    return True
-                except NoSuchElementException:
-                    continue
+            if _first_present(driver, _PRODUCT_INDICATORS):
+                return True
 
         return False
 
@@ -293,9 +325,28 @@ def handle_amazon_bot_safeguard(driver, timeout: int = 15) -> bool:
 # RAG ANALYSIS WITH OPENAI
 # ----------------------------------------------------------------------
 
+# Prompt budget for the page HTML (~30k tokens); latency and cost grow with prompt size
+RAG_MAX_CHARS = 120_000
+
+# Presentation-only attributes; image-bearing data-* (hi-res / lazy-load URLs) are kept
+_NOISE_ATTR_RE = re.compile(
+    r'\s(?:style|class|aria-[\w-]+|'
+    r'data-(?!old-hires|a-dynamic-image|src|srcset|asin)[\w-]+)="[^"]*"',
+    re.IGNORECASE,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _openai_client() -> OpenAI:
+    """One client per process so scrapes share its connection pool (safe across threads)."""
+    return OpenAI()
+
+
 def analyze_product_with_rag(html_content: str) -> str:
     """Use OpenAI to identify product dimensions and image URLs from HTML."""
-    client = OpenAI()
+    client = _openai_client()
+
+    html_content = _NOISE_ATTR_RE.sub("", html_content)[:RAG_MAX_CHARS]
 
     prompt = f"""
     You are a precise information extraction model. Extract product DIMENSIONS and IMAGE URLS from raw Amazon HTML.
@@ -343,23 +394,88 @@ def analyze_product_with_rag(html_content: str) -> str:
     - The JSON must be valid and parseable. No trailing commas. No comments in the JSON.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-5",
-        messages=[{"role": "user", "content": prompt}],
-    )
-    return response.choices[0].message.content
+    request = {
+        "model": "gpt-5",
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+    def _call() -> str:
+        # The largest prompt in the pipeline; under run_many it waits on the shared limiter
+        throttle_sync(request)
+        response = client.chat.completions.create(**request)
+        content = response.choices[0].message.content or ""
+        # Callers parse this as JSON; raising here keeps a bad reply out of the cache
+        try:
+            orjson.loads(content)
+        except orjson.JSONDecodeError:
+            print(f"ERROR: unparseable RAG reply from the model: {content!r}", file=sys.stderr)
+            raise
+        return content
+
+    # Keyed on the full prompt, i.e. on the filtered page content: an unchanged page
+    # skips the GPT round-trip
+    return cached_call({"fn": "analyze_product_with_rag", **request}, _call)
 
 
 # ----------------------------------------------------------------------
 # SELENIUM / SCRAPER CORE
 # ----------------------------------------------------------------------
 
+# Sub-resources the scraper never needs (wildcards per CDP Network.setBlockedURLs)
+_BLOCKED_URL_PATTERNS = (
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.m3u8",
+    "*/gtm.js*", "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+)
+
+
+# Persistent profiles keep Chrome's HTTP/disk cache (CSS/JS) warm across runs. Chrome
+# can't share a profile between processes, so each concurrent browser locks its own slot.
+CHROME_PROFILE_ROOT = Path(
+    os.getenv("CHROME_PROFILE_ROOT", str(Path.home() / ".cache" / "relatear-chrome-profile"))
+)
+_PROFILE_SLOTS = 16
+_DISK_CACHE_BYTES = 512 * 1024 * 1024
+_PROFILE_LOCKS: Dict[int, IO[str]] = {}  # id(driver) -> held lock file
+
+
+def _claim_profile_dir() -> Tuple[Optional[Path], Optional[IO[str]]]:
+    """Lock the first free profile slot; (None, None) if locking is unavailable or all are busy."""
+    if fcntl is None:
+        return None, None
+    for i in range(_PROFILE_SLOTS):
+        slot = CHROME_PROFILE_ROOT / f"worker-{i}"
+        slot.mkdir(parents=True, exist_ok=True)
+        # Lock file sits beside the slot, not inside it (Chrome owns the profile dir)
+        lock = open(CHROME_PROFILE_ROOT / f"worker-{i}.lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            continue
+        return slot, lock
+    return None, None
+
+
+def quit_chrome(driver: webdriver.Chrome) -> None:
+    """Quit a driver from init_chrome and free its profile slot."""
+    try:
+        driver.quit()
+    finally:
+        lock = _PROFILE_LOCKS.pop(id(driver), None)
+        if lock is not None:
+            lock.close()  # closing the file drops the flock
+
+
 def init_chrome(headless: bool = True) -> webdriver.Chrome:
     """
     Initialize Chrome/Chromium with flags that are WSL/container-friendly.
-    Default is headless=True for WSL.
+    Default is headless=True for WSL. Shut it down with quit_chrome().
     """
     chrome_options = Options()
+    # driver.get() returns at DOMContentLoaded instead of waiting for every sub-resource
+    chrome_options.page_load_strategy = "eager"
     if headless:
         chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--disable-gpu")
@@ -372,10 +488,208 @@ def init_chrome(headless: bool = True) -> webdriver.Chrome:
         "Chrome/120.0.0.0 Safari/537.36"
     )
 
+    # Only the HTML is used downstream (image URLs come from the markup), so don't
+    # download images at all
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+
+    profile_dir, profile_lock = _claim_profile_dir()
+    if profile_dir is not None:
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+        chrome_options.add_argument(f"--disk-cache-size={_DISK_CACHE_BYTES}")
+
     # If you use Chromium in WSL, you may need to uncomment and adjust:
     # chrome_options.binary_location = "/usr/bin/chromium-browser"
 
-    return webdriver.Chrome(options=chrome_options)
+    try:
+        driver = webdriver.Chrome(options=chrome_options)
+    except BaseException:
+        if profile_lock is not None:
+            profile_lock.close()
+        raise
+    if profile_lock is not None:
+        _PROFILE_LOCKS[id(driver)] = profile_lock
+    # The prefs miss CSS background images, fonts, video and trackers; block those over CDP
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(_BLOCKED_URL_PATTERNS)})
+    return driver
+
+
+class ChromeDriverPool:
+    """
+    Thread-safe pool of reusable Chrome sessions.
+
+    Starting Chrome + chromedriver costs 1-3 s, which dominates a short scrape, so drivers
+    are kept alive between URLs instead of being quit after each one:
+
+        with pool.acquire() as driver:
+            driver.get(url)
+
+    At most `size` drivers exist at once (callers beyond that block until one is free).
+    Drivers are created lazily, reset (cookies cleared, about:blank) when released, and
+    quit after `max_uses` scrapes to bound Chrome's memory growth.
+    """
+
+    def __init__(self, size: int = 4, headless: bool = True, max_uses: int = 50):
+        self.size = size
+        self.headless = headless
+        self.max_uses = max_uses
+        self._idle: "queue.LifoQueue[webdriver.Chrome]" = queue.LifoQueue()
+        self._uses: Dict[webdriver.Chrome, int] = {}
+        self._live = 0  # drivers alive or being launched
+        self._lock = threading.Lock()
+
+    def _take(self) -> webdriver.Chrome:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                # Count the slot before the (slow) launch so concurrent callers can't overshoot
+                create = self._live < self.size
+                if create:
+                    self._live += 1
+            if create:
+                break
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue  # a busy driver may have been retired meanwhile; re-check capacity
+        try:
+            driver = init_chrome(headless=self.headless)
+        except BaseException:
+            with self._lock:
+                self._live -= 1
+            raise
+        with self._lock:
+            self._uses[driver] = 0
+        return driver
+
+    def _discard(self, driver: webdriver.Chrome) -> None:
+        with self._lock:
+            self._uses.pop(driver, None)
+            self._live -= 1
+        try:
+            quit_chrome(driver)
+        except WebDriverException:
+            pass
+
+    def _release(self, driver: webdriver.Chrome) -> None:
+        with self._lock:
+            self._uses[driver] += 1
+            worn_out = self._uses[driver] >= self.max_uses
+        if worn_out:
+            self._discard(driver)
+            return
+        try:
+            # Drop per-site state so the next URL starts clean
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+        except WebDriverException:
+            # Crashed or wedged session: replace it on next acquire
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def acquire(self) -> Iterator[webdriver.Chrome]:
+        """Borrow a driver for the duration of the `with` block."""
+        driver = self._take()
+        try:
+            yield driver
+        finally:
+            self._release(driver)
+
+    def close(self) -> None:
+        """Quit every idle driver (drivers currently borrowed are quit when released)."""
+        self.max_uses = 0
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+
+_POOLS: Dict[bool, ChromeDriverPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_driver_pool(headless: bool = True) -> ChromeDriverPool:
+    """The process-wide driver pool for the given headless mode."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(headless)
+        if pool is None:
+            pool = _POOLS[headless] = ChromeDriverPool(headless=headless)
+        return pool
+
+
+@atexit.register
+def _close_driver_pools() -> None:
+    for pool in list(_POOLS.values()):
+        pool.close()
+
+
+def _page_html(driver) -> str:
+    """Serialized DOM straight from CDP; page_source goes through an extra WebDriver JSON hop."""
+    try:
+        # depth=0: only the root node id is needed, not the whole tree as JSON
+        root = driver.execute_cdp_cmd("DOM.getDocument", {"depth": 0})["root"]["nodeId"]
+        return driver.execute_cdp_cmd("DOM.getOuterHTML", {"nodeId": root})["outerHTML"]
+    except WebDriverException:
+        return driver.page_source
+
+
+# Resolves once the main thread goes idle (or after 1.5 s), instead of a fixed sleep
+_IDLE_JS = (
+    "const done = arguments[arguments.length - 1];"
+    "(window.requestIdleCallback || (f => setTimeout(f, 0)))(() => done(true), {timeout: 1500});"
+)
+
+
+def _wait_for_idle(driver) -> None:
+    try:
+        driver.execute_async_script(_IDLE_JS)
+    except (JavascriptException, TimeoutException):
+        pass
+
+
+# Ikea pages also keep <li> (their specs live in lists)
+_TAGS_IKEA = frozenset({"img", "li", "span", "td"})
+_TAGS_DEFAULT = frozenset({"img", "span", "td"})
+
+# page_source is already decoded; parsing it as UTF-8 bytes sidesteps lxml's refusal of
+# str input that carries an <?xml encoding=...?> declaration
+_HTML_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+
+
+def _filter_tags(html: str, tags: frozenset) -> str:
+    """
+    Serialize every element of `tags` in document order, space-separated. An element
+    that matches is kept whole (its descendants are not emitted again), so nested spans
+    inside a <td> don't duplicate text in the prompt. One linear walk over a C-parsed
+    tree, written straight into one buffer (no intermediate list + join).
+    """
+    if not html.strip():
+        return ""
+    root = lxml_html.fromstring(html.encode("utf-8"), parser=_HTML_PARSER)
+    buf = io.StringIO()
+    write = buf.write
+    sep = ""
+    stack = [root]
+    while stack:
+        el = stack.pop()
+        if el.tag in tags:
+            write(sep)
+            write(lxml_html.tostring(el, encoding="unicode", with_tail=False))
+            sep = " "
+            continue
+        # Reversed so children pop off the stack in document order
+        stack.extend(reversed(el))
+    return buf.getvalue()
 
 
 def scrape_and_analyze_url(
@@ -385,22 +699,23 @@ def scrape_and_analyze_url(
     headless: bool = True,
     out_dir: str = ".",
     output_prefix: str = "page",
-) -> Tuple[str, Path, Path]:
+    save_raw: bool = False,
+) -> Tuple[str, Optional[Path], Path]:
     """
-    Navigate to `url`, dump raw HTML, filter to img/span/td/(li for Ikea),
-    run RAG, and return:
+    Navigate to `url`, filter the HTML to img/span/td/(li for Ikea), run RAG,
+    and return:
       (analysis_result, raw_html_path, filtered_html_path)
+    The raw page is only dumped (and raw_html_path set) when save_raw=True.
     """
     out_path = Path(out_dir)
     out_path.mkdir(parents=True, exist_ok=True)
 
-    driver = init_chrome(headless=headless)
-    try:
+    with get_driver_pool(headless).acquire() as driver:
         driver.get(url)
 
-        # Wait for DOM ready
+        # Wait for DOM ready (parsed; sub-resources may still be loading)
         WebDriverWait(driver, 20).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
+            lambda d: d.execute_script("return document.readyState") in ("interactive", "complete")
         )
 
         # Only handle Amazon safeguard if company is explicitly Amazon
@@ -419,68 +734,49 @@ def scrape_and_analyze_url(
             except NameError:
                 pass
 
-        time.sleep(2)  # small buffer for dynamic content
+        _wait_for_idle(driver)  # let scripts that fill in the gallery/specs settle
 
         # --- Retrieve HTML ---
-        html = driver.page_source
+        html = _page_html(driver)
+
+    # The driver goes back to the pool here: filtering and the (slow) RAG call don't need it
+    raw_path = None
+    if save_raw:
         raw_path = out_path / f"{output_prefix}.html"
-        raw_path.write_text(html, encoding="utf-8")
-
-        # safer Ikea detection
-        is_ikea = bool(company and "ikea" in company.lower())
-        if is_ikea:
-            tags_group = "li|span|td"
-        else:
-            tags_group = "span|td"
-
-        pattern = re.compile(
-            rf"""
-            # <img ...> (self-closing or not)
-            <img\b[^>]*>
-            |
-            # <({tags_group}) ...> ... </same-tag>
-            <({tags_group})\b[^>]*>         # \1 = tag name
-                (?:
-                    (?!</?\1\b)             # don't let the same tag start/end here
-                    .
-                )*?
-            </\1>
-            """,
-            re.IGNORECASE | re.DOTALL | re.VERBOSE,
-        )
+        raw_path.write_bytes(html.encode("utf-8"))
 
-        matches = [m.group(0) for m in pattern.finditer(html)]
-        filtered_html = " ".join(matches)
+    # safer Ikea detection
+    is_ikea = bool(company and "ikea" in company.lower())
+    filtered_html = _filter_tags(html, _TAGS_IKEA if is_ikea else _TAGS_DEFAULT)
 
-        filtered_path = out_path / f"{output_prefix}_filtered.html"
-        filtered_path.write_text(filtered_html, encoding="utf-8")
+    filtered_path = out_path / f"{output_prefix}_filtered.html"
+    filtered_path.write_bytes(filtered_html.encode("utf-8"))
 
-        # --- Analyze with RAG ---
-        try:
-            analysis_result = analyze_product_with_rag(filtered_html)
-        except NameError:
-            analysis_result = (
-                "analyze_product_with_rag(filtered_html) not found.\n"
-                "Provide your implementation or import it to get real results."
-            )
+    # --- Analyze with RAG ---
+    try:
+        analysis_result = analyze_product_with_rag(filtered_html)
+    except NameError:
+        analysis_result = (
+            "analyze_product_with_rag(filtered_html) not found.\n"
+            "Provide your implementation or import it to get real results."
+        )
 
-        print("\n" + "=" * 50)
-        print("PRODUCT ANALYSIS RESULT:")
-        print("=" * 50)
-        print(analysis_result)
-        print("=" * 50)
+    # Same JSON the pipeline logs as its scrape payload; only dump it when debugging
+    logger.debug("PRODUCT ANALYSIS RESULT:\n%s", analysis_result)
 
-        return analysis_result, raw_path, filtered_path
-
-    finally:
-        time.sleep(1)
-        driver.quit()
+    return analysis_result, raw_path, filtered_path
 
 
-def main(url: Optional[str] = None, company: Optional[str] = None) -> Tuple[str, Path, Path]:
+def main(
+    url: Optional[str] = None,
+    company: Optional[str] = None,
+    output_prefix: str = "page",
+) -> Tuple[str, Optional[Path], Path]:
     """
     Pass a URL and company into the scraper/analyzer.
     Only triggers Amazon safeguard logic when company == 'Amazon'.
+    Concurrent callers must pass distinct `output_prefix`es (the filtered HTML is
+    written to ./<output_prefix>_filtered.html).
 
     In WSL / headless environments, we force headless=True here.
     """
@@ -491,10 +787,39 @@ def main(url: Optional[str] = None, company: Optional[str] = None) -> Tuple[str,
         company=company,
         headless=True,     # <-- HEADLESS ON FOR WSL
         out_dir=".",
-        output_prefix="page",
+        output_prefix=output_prefix,
     )
 
 
+def main_many(
+    jobs: List[Tuple[str, Optional[str]]],
+    workers: int = 4,
+    out_dir: str = ".",
+) -> List[Optional[Tuple[str, Optional[Path], Path]]]:
+    """
+    Scrape and analyze many (url, company) pairs concurrently on pooled Chrome drivers.
+
+    Threads are enough (the work is browser and network I/O). Results come back in
+    input order, None where a URL failed; each URL's filtered HTML is written to
+    `out_dir` as page_<i>_filtered.html so workers don't overwrite each other.
+    """
+    pool = get_driver_pool(headless=True)
+    pool.size = max(pool.size, workers)
+
+    def _one(i: int, url: str, company: Optional[str]):
+        try:
+            return scrape_and_analyze_url(
+                url, company=company, headless=True, out_dir=out_dir, output_prefix=f"page_{i}",
+            )
+        except Exception as e:
+            print(f"WARNING: scrape failed for {url}: {e}", file=sys.stderr)
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(_one, i, url, company) for i, (url, company) in enumerate(jobs)]
+        return [f.result() for f in futures]
+
+
 if __name__ == "__main__":
     # Example Wayfair URL (change as needed):
     url = (
@@ -509,4 +834,5 @@ if __name__ == "__main__":
         url = sys.argv[1]
     company = sys.argv[2] if len(sys.argv) >= 3 else "Ikea"
 
-    main(url, company)
+    analysis_result, _, _ = main(url, company)
+    print(analysis_result)
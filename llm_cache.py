@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+llm_cache.py
+
+Tiny on-disk cache for GPT calls.
+
+Each entry is keyed by the SHA-256 of the JSON-serialized request payload (model,
+messages/input, ...) and stores the caller's *parsed* result as one JSON file under
+LLM_CACHE_DIR (default: ./.gpt_cache). Re-running the pipeline on the same URL then
+skips the multi-second GPT round-trips entirely.
+
+Usage:
+    result = cached_call({"fn": "extract", **request}, lambda: do_request())
+    result = await cached_call_async({"fn": "rank", **request}, do_request_async)
+
+Environment:
+    LLM_CACHE_DISABLED=1   bypass the cache (always call through, never store)
+    LLM_CACHE_DIR=<path>   where cache files live
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR", ".gpt_cache"))
+
+
+def cache_disabled() -> bool:
+    return os.getenv("LLM_CACHE_DISABLED", "").strip().lower() in ("1", "true", "yes")
+
+
+def cache_key(payload: Dict[str, Any]) -> str:
+    """Stable hash of a request payload."""
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _load(key: str) -> Tuple[bool, Any]:
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return True, json.load(f)["value"]
+    except (OSError, ValueError, KeyError):
+        # Missing or corrupt entry -> treat as a miss
+        return False, None
+
+
+def _store(key: str, value: Any) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Write to a temp file and rename so concurrent readers never see a partial entry
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"value": value}, f, ensure_ascii=False)
+        os.replace(tmp, CACHE_DIR / f"{key}.json")
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def cached_call(
+    payload: Dict[str, Any],
+    fn: Callable[[], Any],
+    keep: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """
+    Return the cached result for `payload`, or call `fn()` and cache what it returns.
+    If `keep` is given, results it rejects are returned but not stored (e.g. transient
+    empty results that should be retried next run).
+    """
+    if cache_disabled():
+        return fn()
+    key = cache_key(payload)
+    hit, value = _load(key)
+    if hit:
+        return value
+    value = fn()
+    if keep is None or keep(value):
+        _store(key, value)
+    return value
+
+
+async def cached_call_async(
+    payload: Dict[str, Any],
+    fn: Callable[[], Awaitable[Any]],
+    keep: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """Async twin of cached_call: `fn` is a coroutine function."""
+    if cache_disabled():
+        return await fn()
+    key = cache_key(payload)
+    hit, value = _load(key)
+    if hit:
+        return value
+    value = await fn()
+    if keep is None or keep(value):
+        _store(key, value)
+    return value
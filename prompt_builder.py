@@ -4,12 +4,11 @@ prompt_generator.py
 
 Given a product page URL, this module:
 
-1) Uses extract_url_info.extract_with_gpt5(url) to get the target object name(s)
-   (e.g., ["sectional", "couch", "sofa"]) and picks a main target object
-   (e.g., "couch").
+1) Runs best_image_selector.get_best_image_result(url), whose pipeline uses
+   extract_url_info to get the target object name(s) (e.g., ["sectional",
+   "couch", "sofa"]), and picks a main target object (e.g., "couch").
 
-2) Uses best_image_selector.get_best_image_url(url) to get the URL of the
-   best product image.
+2) Takes the URL of the best product image from that same result.
 
 3) Uses a GPT vision call to inspect that best image and identify objects
    that are NOT the target object (e.g., "blanket", "pillow", "person",
@@ -26,12 +25,13 @@ Given a product page URL, this module:
 
 from __future__ import annotations
 
-import json
+import functools
 import os
 import sys
-from typing import Tuple, List
+from typing import Any, Dict, List, Tuple
 
 from dotenv import load_dotenv  # type: ignore
+import orjson  # pip install orjson
 from openai import OpenAI  # pip install openai
 
 # Load env vars (for OPENAI_API_KEY)
@@ -42,25 +42,17 @@ load_dotenv()
 # ---------------------------------------------------------------------
 try:
     # best_image_selector.py should define:
-    #   def get_best_image_url(url: str, max_images: int = 30) -> str
-    from best_image_selector import get_best_image_url
+    #   def get_best_image_result(url: str, max_images: int = 30, ...) -> Dict[str, Any]
+    from best_image_selector import BEST_IMAGE_OUT_PATH, get_best_image_result, save_best_image
 except ImportError:
     print(
-        "ERROR: Could not import get_best_image_url from best_image_selector.py",
+        "ERROR: Could not import get_best_image_result from best_image_selector.py",
         file=sys.stderr,
     )
     raise
 
-try:
-    # extract_url_info.py defines:
-    #   def extract_with_gpt5(url: str) -> Dict[str, Any]
-    from extract_url_info import extract_with_gpt5
-except ImportError:
-    print(
-        "ERROR: Could not import extract_with_gpt5 from extract_url_info.py",
-        file=sys.stderr,
-    )
-    raise
+from async_clients import run_sync
+from llm_cache import cached_call
 
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -69,6 +61,36 @@ if not OPENAI_API_KEY:
     sys.exit(1)
 
 
+@functools.lru_cache(maxsize=None)
+def _openai_client() -> OpenAI:
+    """Shared by every PromptGenerator so back-to-back calls reuse pooled connections."""
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+
+def _cached_best_image(url: str) -> Dict[str, Any]:
+    """
+    {"image_url", "seed_product_names"} from the best-image pipeline, memoized per URL
+    (see llm_cache) so repeat runs skip Chrome + GPT.
+    """
+    computed = False
+
+    def _compute() -> Dict[str, Any]:
+        nonlocal computed
+        computed = True
+        result = get_best_image_result(url)
+        return {
+            "image_url": result["best_image"]["image_url"],
+            "seed_product_names": result.get("seed_product_names") or [],
+        }
+
+    # Don't pin a miss: an empty scrape (bot wall, no images) is usually transient
+    best = cached_call({"fn": "best_image", "url": url}, _compute, keep=lambda r: bool(r["image_url"]))
+    if best["image_url"] and not computed:
+        # A cache hit skips the pipeline, which is what saves the image for the IS-Net step
+        run_sync(save_best_image(best["image_url"], out_path=BEST_IMAGE_OUT_PATH))
+    return best
+
+
 class PromptGenerator:
     """
     High-level helper:
@@ -84,7 +106,7 @@ class PromptGenerator:
 
     def __init__(self, model: str = "gpt-5"):
         self.model = model
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.client = _openai_client()
 
     # ----------------------- PUBLIC API ----------------------- #
     def generate_target_and_negative(self, url: str) -> Tuple[str, str]:
@@ -102,22 +124,17 @@ class PromptGenerator:
              "blanket, pillow, person, rug, coffee table, clutter, text, watermark")
         """
 
-        # 1) Get target object from extract_url_info
-        info = extract_with_gpt5(url)
-        if not isinstance(info, dict):
-            raise RuntimeError("extract_with_gpt5 did not return a dict.")
-
-        product_names = info.get("product_name") or []
-        if not isinstance(product_names, list):
-            product_names = [str(product_names)]
+        # 1) + 2) One pipeline run gives both the extracted names and the best image
+        # (the pipeline already runs the extract; a second call here would duplicate it)
+        best = _cached_best_image(url)
+        best_image_url = best["image_url"]
+        product_names = best["seed_product_names"]
 
         # Pick a main target object string; fall back to "product" if missing
         target_object = (
             str(product_names[0]) if product_names else "product"
         ).strip()
 
-        # 2) Get best image URL from best_image_selector
-        best_image_url = get_best_image_url(url)
         if not best_image_url:
             # No best image found → empty negative prompt
             return target_object, ""
@@ -181,30 +198,23 @@ class PromptGenerator:
         resp = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
+            # JSON mode: the reply is always a parseable object (no markdown fences)
+            response_format={"type": "json_object"},
         )
 
         content = (resp.choices[0].message.content or "").strip()
 
-        negative_objects: List[str] = []
+        raw_list: List[object] = []
         try:
-            data = json.loads(content)
-            if isinstance(data, dict):
-                raw_list = data.get("negative_objects", [])
-                if isinstance(raw_list, list):
-                    negative_objects = [
-                        str(x).strip() for x in raw_list if str(x).strip()
-                    ]
-        except Exception:
-            negative_objects = []
-
-        # Deduplicate, lowercase, join with commas
-        seen = set()
-        cleaned: List[str] = []
-        for obj in negative_objects:
-            o = obj.lower()
-            if o and o not in seen:
-                seen.add(o)
-                cleaned.append(o)
+            data = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            print(f"WARNING: negative-prompt reply was not JSON: {content!r}", file=sys.stderr)
+            data = None
+        if isinstance(data, dict) and isinstance(data.get("negative_objects"), list):
+            raw_list = data["negative_objects"]
+
+        # Strip + lowercase once per item, drop blanks, dedup (order-preserving) in one pass
+        cleaned = dict.fromkeys(s for s in (str(x).strip().lower() for x in raw_list) if s)
 
         return ", ".join(cleaned)
 
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+rate_limit.py
+
+Shared OpenAI rate limiting for bulk runs.
+
+best_image_selector.run_many() installs a RateLimiter in RATE_LIMITER; every GPT call
+(extract, enrich, rank, and the scraper's RAG call) waits on it before sending:
+
+    await throttle(request)          # coroutine on the shared loop
+    throttle_sync(request)           # worker thread (e.g. the scraper under to_thread)
+
+Outside run_many() no limiter is set and both are no-ops. The context variable is
+inherited by tasks and by asyncio.to_thread workers, so the scraper thread sees the same
+limiter as the pipeline that started it. Cache hits never reach these calls.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import time
+from typing import Any, Dict, Optional
+
+from async_clients import run_sync
+
+
+class RateLimiter:
+    """
+    Token bucket over requests/minute and (approximate) tokens/minute, in the style of the
+    OpenAI cookbook's parallel request processor. Both buckets refill continuously; acquire()
+    waits until one request and `tokens` tokens are available.
+
+    Construct it on the shared loop (before 3.10 asyncio.Lock binds to the loop current
+    at construction).
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = max(1, int(rpm))
+        self.tpm = max(1, int(tpm))
+        self._requests = float(self.rpm)
+        self._tokens = float(self.tpm)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed, self._last = now - self._last, now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    async def acquire(self, tokens: int) -> None:
+        tokens = min(tokens, self.tpm)  # a single oversized request must still be able to go
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60.0 / self.rpm,
+                    (tokens - self._tokens) * 60.0 / self.tpm,
+                    0.05,
+                )
+                await asyncio.sleep(wait)
+
+
+# Set by run_many(); tasks and worker threads spawned inside it inherit the limiter.
+RATE_LIMITER: contextvars.ContextVar[Optional[RateLimiter]] = contextvars.ContextVar(
+    "RATE_LIMITER", default=None
+)
+
+
+def _estimate_tokens(request: Dict[str, Any]) -> int:
+    # ~4 chars per token is close enough for budgeting
+    return len(json.dumps(request, ensure_ascii=False)) // 4
+
+
+async def throttle(request: Dict[str, Any]) -> None:
+    """Wait for rate-limit headroom before sending `request` (no-op outside run_many)."""
+    limiter = RATE_LIMITER.get()
+    if limiter is not None:
+        await limiter.acquire(_estimate_tokens(request))
+
+
+def throttle_sync(request: Dict[str, Any]) -> None:
+    """throttle() for blocking code in a worker thread; waits on the shared loop."""
+    limiter = RATE_LIMITER.get()
+    if limiter is not None:
+        run_sync(limiter.acquire(_estimate_tokens(request)))